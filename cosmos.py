@@ -117,14 +117,17 @@ def main():
     processing_results = []
 
     # Process each valid clip
-    for clip_name, clip_result in validation_result.clip_results.items():
-        if clip_result.is_valid:
-            result = processor.process_clip(clip_result)
-            processing_results.append(result)
-            if result.success:
-                print_success(f"Processed clip: {clip_name}. Output: {result.output_path}")
-            else:
-                print_error(f"Failed to process clip {clip_name}: {result.error}")
+    valid_clips = [
+        clip_result for clip_result in validation_result.clip_results.values()
+        if clip_result.is_valid
+    ]
+    for result in processor.process_clips(valid_clips):
+        processing_results.append(result)
+        clip_name = result.clip.name
+        if result.success:
+            print_success(f"Processed clip: {clip_name}. Output: {result.output_path}")
+        else:
+            print_error(f"Failed to process clip {clip_name}: {result.error}")
 
     end_time = datetime.now()
     processing_time = end_time - start_time
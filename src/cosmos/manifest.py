@@ -55,6 +55,10 @@ class Position:
     def path_fragment(self) -> str:
         """Return a directory path fragment like '0H/0M/25S'."""
         return f"{self.hour}H/{self.minute}M/{self.second}S"
+    
+    def minute_fragment(self) -> str:
+        """Return the parent directory fragment like '0H/0M'."""
+        return f"{self.hour}H/{self.minute}M"
 
 
 @dataclass
@@ -145,8 +149,8 @@ class ManifestParser:
         for elem in root:
             try:
                 name = elem.attrib['Name']
-                self.logger.debug(f"Parsing clip: {name}")
-                self.logger.debug(f"Raw attributes: {elem.attrib}")
+                self.logger.debug("Parsing clip: %s", name)
+                self.logger.debug("Raw attributes: %s", elem.attrib)
                 
                 start_epoch = float(elem.attrib['Epoch'])
                 pos = Position.from_string(elem.attrib['Pos'])
@@ -170,9 +174,9 @@ class ManifestParser:
                 )
                 
                 self.logger.debug(
-                    f"Parsed {name}: start_epoch={start_epoch}, "
-                    f"pos={pos.to_string()}, "
-                    f"frame_range={start_idx}-{end_idx}"
+                    "Parsed %s: start_epoch=%s, pos=%dH/%dM/%sS, frame_range=%d-%d",
+                    name, start_epoch, pos.hour, pos.minute, pos.second,
+                    start_idx, end_idx
                 )
                 
             except (KeyError, ValueError) as e:
@@ -6,9 +6,11 @@ import sys
 import shutil
 from pathlib import Path
 import psutil
-from typing import Optional
+from typing import List, Optional
 
 from .utils import print_info, print_warning, print_error, print_success, check_ffmpeg
+from .manifest import ManifestParser
+from .validation import InputValidator
 
 def check_python_version(min_version=(3, 8)):
     return sys.version_info >= min_version
@@ -27,6 +29,15 @@ def check_required_codecs():
     # could parse `ffmpeg -encoders` but omitted for brevity.
     return check_ffmpeg()
 
+def _list_subdirs(parent: str, suffix: str) -> List[str]:
+    """List paths of subdirectories of parent whose names end with suffix"""
+    try:
+        with os.scandir(parent) as it:
+            # DirEntry.is_dir() uses the type from the directory listing, no stat per entry
+            return [entry.path for entry in it if entry.name.endswith(suffix) and entry.is_dir()]
+    except OSError:
+        return []
+
 def check_directory_structure(input_dir: Path, manifest_path: Optional[Path] = None):
     """
     Basic directory structure checks:
@@ -76,7 +87,7 @@ def check_directory_structure(input_dir: Path, manifest_path: Optional[Path] = N
             }
 
     # Check basic structure: at least one H directory, inside it at least one M directory, inside it at least one S directory with meta.json
-    hour_dirs = [d for d in input_dir.glob("*H") if d.is_dir()]
+    hour_dirs = _list_subdirs(str(input_dir), "H")
     if not hour_dirs:
         return {
             "Directory Structure": {
@@ -89,12 +100,9 @@ def check_directory_structure(input_dir: Path, manifest_path: Optional[Path] = N
     # Check at least one M directory
     found_valid_structure = False
     for hdir in hour_dirs:
-        mdirs = [m for m in hdir.glob("*M") if m.is_dir()]
-        for mdir in mdirs:
-            sdirs = [s for s in mdir.glob("*S") if s.is_dir()]
-            for sdir in sdirs:
-                meta = sdir / "meta.json"
-                if meta.is_file():
+        for mdir in _list_subdirs(hdir, "M"):
+            for sdir in _list_subdirs(mdir, "S"):
+                if os.path.isfile(os.path.join(sdir, "meta.json")):
                     found_valid_structure = True
                     break
             if found_valid_structure:
@@ -168,6 +176,40 @@ def validate_system_requirements(input_dir: Path, output_dir: Path):
     }
     return checks
 
+def check_output_space(input_dir: Path, output_dir: Path, manifest_path: Optional[Path] = None):
+    """
+    Compare a quick output size estimate against free space in output_dir.
+    
+    Uses InputValidator.estimate_only, which lists segment directories but
+    reads no meta.json. Invalid segment directories are counted too, so the
+    figure can be somewhat above what a full validation would report.
+    Assumes check_directory_structure has passed (a manifest is resolvable).
+    """
+    if manifest_path is None:
+        manifest_path = next(input_dir.glob("*.xml"))
+    try:
+        parser = ManifestParser(manifest_path)
+        estimate = InputValidator(input_dir, output_dir, parser).estimate_only()
+        free = shutil.disk_usage(output_dir).free
+    except Exception as e:
+        return {
+            "Estimated Output Space": {
+                "check": False,
+                "message": f"Could not estimate output size: {e}",
+                "help": "Check the manifest and output directory."
+            }
+        }
+    return {
+        "Estimated Output Space": {
+            "check": free > estimate,
+            "message": (
+                f"Estimated output needs {estimate / 1024**3:.1f}GB "
+                f"but only {free / 1024**3:.1f}GB is free."
+            ),
+            "help": "Free disk space or choose another output directory."
+        }
+    }
+
 def format_validation_results(validation_results):
     all_good = True
     for category, result in validation_results.items():
@@ -187,10 +229,16 @@ def run_self_test(input_dir: Path, output_dir: Path, manifest_path: Optional[Pat
     dir_checks = check_directory_structure(input_dir, manifest_path)
     dir_ok = format_validation_results(dir_checks)
 
+    space_ok = True
+    if dir_ok:
+        print_info("Estimating output size...")
+        space_checks = check_output_space(input_dir, output_dir, manifest_path)
+        space_ok = format_validation_results(space_checks)
+
     windows_ok = True
     if platform.system() == "Windows":
         print_info("Performing Windows-specific checks...")
         win_checks = check_windows_specific(input_dir)
         windows_ok = format_validation_results(win_checks)
 
-    return sys_ok and dir_ok and windows_ok
+    return sys_ok and dir_ok and space_ok and windows_ok
@@ -1,15 +1,37 @@
+import functools
 import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 import subprocess
 import tempfile
+import threading
 import logging
 
 from .validation import ClipValidationResult, SegmentInfo
 from .manifest import ClipInfo
 
+# Concurrent NVENC sessions allowed by consumer NVIDIA drivers
+_DEFAULT_NVENC_SESSIONS = 2
+
+# NVENC keyframe interval in frames; shorter than the encoder default so
+# outputs seek quickly, at the cost of somewhat larger files at a fixed -qp
+_NVENC_GOP_FRAMES = 60
+
+# Platform checks resolved once at import; CREATE_NO_WINDOW only exists on Windows
+_IS_WINDOWS = os.name == 'nt'
+_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if _IS_WINDOWS else 0
+
+# ffmpeg progress lines look like "frame= 1234 fps= 30 ..."
+_FRAME_PROGRESS_RE = re.compile(r"frame=\s*(\d+)")
+
+# Trailing ffmpeg stderr lines kept for error reporting
+_STDERR_TAIL_LINES = 50
+
 class ProcessingMode(Enum):
     QUALITY = "quality"        # Highest quality, all threads
     BALANCED = "balanced"      # Good quality, all threads
@@ -58,6 +80,61 @@ class EncoderType(Enum):
             
         return encoders
 
+@functools.lru_cache(maxsize=1)
+def _probe_ffmpeg_encoders() -> Tuple[EncoderType, ...]:
+    """
+    Query ffmpeg once per process for usable encoders, in preferred order.
+    
+    Software x264 is always included as the last-resort fallback.
+    """
+    try:
+        # Query ffmpeg for encoder list
+        result = subprocess.run(
+            ["ffmpeg", "-encoders"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (subprocess.SubprocessError, OSError):
+        # If ffmpeg is missing or the query fails, default to software encoding
+        logging.getLogger(__name__).warning("Failed to detect encoders, defaulting to software")
+        return (EncoderType.SOFTWARE_X264,)
+    
+    # Check each platform-specific encoder against the ffmpeg build
+    output = result.stdout.lower()
+    available = [
+        encoder for encoder in EncoderType.get_platform_encoders()
+        if encoder.value in output
+    ]
+    
+    # Always add software encoder as fallback
+    if EncoderType.SOFTWARE_X264 not in available:
+        available.append(EncoderType.SOFTWARE_X264)
+    return tuple(available)
+
+# Default CRF/QP per quality mode, used unless ProcessingOptions.crf is set
+_DEFAULT_CRF: Dict[ProcessingMode, int] = {
+    ProcessingMode.QUALITY: 18,
+    ProcessingMode.BALANCED: 23,
+    ProcessingMode.PERFORMANCE: 28,
+    ProcessingMode.LOW_MEMORY: 23,  # Same as BALANCED
+    ProcessingMode.MINIMAL: 28      # Same as PERFORMANCE
+}
+
+# Speed preset per encoder and quality mode; PERFORMANCE/MINIMAL are never slower than BALANCED
+_ENCODER_PRESETS: Dict[Tuple[EncoderType, ProcessingMode], str] = {
+    (EncoderType.SOFTWARE_X264, ProcessingMode.QUALITY): "slower",
+    (EncoderType.SOFTWARE_X264, ProcessingMode.BALANCED): "faster",  # Near medium quality, much quicker
+    (EncoderType.SOFTWARE_X264, ProcessingMode.PERFORMANCE): "veryfast",
+    (EncoderType.SOFTWARE_X264, ProcessingMode.LOW_MEMORY): "faster",  # Same as BALANCED, lighter lookahead than medium
+    (EncoderType.SOFTWARE_X264, ProcessingMode.MINIMAL): "veryfast",
+    (EncoderType.NVIDIA_NVENC, ProcessingMode.QUALITY): "p7",
+    (EncoderType.NVIDIA_NVENC, ProcessingMode.BALANCED): "p2",
+    (EncoderType.NVIDIA_NVENC, ProcessingMode.PERFORMANCE): "p1",
+    (EncoderType.NVIDIA_NVENC, ProcessingMode.LOW_MEMORY): "p2",
+    (EncoderType.NVIDIA_NVENC, ProcessingMode.MINIMAL): "p1",
+}
+
 @dataclass
 class ProcessingResult:
     """Results from processing a clip"""
@@ -87,6 +164,8 @@ class VideoProcessor:
         self.options = options
         self.logger = logger or logging.getLogger(__name__)
         self._available_encoders = self._detect_encoders()
+        # Only one CPU encode at a time, even when NVENC clips run concurrently
+        self._software_encode_lock = threading.Lock()
         
         self.logger.debug(f"Initialized VideoProcessor with options: {options}")
         self.logger.debug(f"Available encoders: {[e.value for e in self._available_encoders]}")
@@ -95,39 +174,12 @@ class VideoProcessor:
         """
         Detect available encoders on the system.
         Returns list of encoders in preferred order.
+        
+        ffmpeg is only queried once per process; later calls reuse the result.
         """
-        available = []
-        try:
-            # Query ffmpeg for encoder list
-            result = subprocess.run(
-                ["ffmpeg", "-encoders"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            # Parse output to detect available encoders
-            output = result.stdout.lower()
-            
-            # Get platform-specific encoders
-            platform_encoders = EncoderType.get_platform_encoders()
-            
-            # Check each platform-specific encoder
-            for encoder in platform_encoders:
-                if encoder.value in output:
-                    available.append(encoder)
-                    self.logger.debug(f"Found encoder: {encoder.value}")
-            
-            # Always add software encoder as fallback
-            if EncoderType.SOFTWARE_X264 not in available:
-                available.append(EncoderType.SOFTWARE_X264)
-                self.logger.debug("Added software encoder as fallback")
-            
-        except subprocess.SubprocessError:
-            # If ffmpeg query fails, default to software encoding
-            self.logger.warning("Failed to detect encoders, defaulting to software")
-            available.append(EncoderType.SOFTWARE_X264)
-            
+        available = list(_probe_ffmpeg_encoders())
+        for encoder in available:
+            self.logger.debug(f"Found encoder: {encoder.value}")
         return available
 
     def _get_encoder_settings(self, 
@@ -141,19 +193,16 @@ class VideoProcessor:
             thread_count: Number of threads to use (None for auto)
         """
         # Base quality settings
-        crf = self.options.crf or {
-            ProcessingMode.QUALITY: 18,
-            ProcessingMode.BALANCED: 23,
-            ProcessingMode.PERFORMANCE: 28,
-            ProcessingMode.LOW_MEMORY: 23,  # Same as BALANCED
-            ProcessingMode.MINIMAL: 28      # Same as PERFORMANCE
-        }[self.options.quality_mode]
+        mode = self.options.quality_mode
+        crf = self.options.crf or _DEFAULT_CRF[mode]
         
         # Start with encoder-specific settings
         if encoder == EncoderType.NVIDIA_NVENC:
             settings = [
                 "-c:v", "h264_nvenc",
-                "-preset", "p7" if self.options.quality_mode == ProcessingMode.QUALITY else "p4",
+                "-preset", _ENCODER_PRESETS[(encoder, mode)],
+                # Shorter keyframe interval for cheaper seeking
+                "-g", str(_NVENC_GOP_FRAMES),
                 "-qp", str(crf)
             ]
         elif encoder == EncoderType.APPLE_VIDEOTOOLBOX:
@@ -168,7 +217,7 @@ class VideoProcessor:
         elif encoder == EncoderType.SOFTWARE_X264:
             settings = [
                 "-c:v", "libx264",
-                "-preset", "slower" if self.options.quality_mode == ProcessingMode.QUALITY else "medium",
+                "-preset", _ENCODER_PRESETS[(encoder, mode)],
                 "-crf", str(crf)
             ]
             
@@ -184,6 +233,22 @@ class VideoProcessor:
         
         return settings
 
+    def _get_decoder_settings(self, encoder: EncoderType) -> List[str]:
+        """
+        Get ffmpeg input arguments for decoding alongside the specified encoder
+        
+        NVDEC decoding (-hwaccel cuda) is tried alongside NVENC. ffmpeg may
+        list NVENC on machines without a usable GPU; that attempt then fails
+        and the fallback encoder runs without hwaccel. Frames are handed
+        back in system memory because the filter graph runs on the CPU.
+        
+        Args:
+            encoder: Encoder the output will be produced with
+        """
+        if encoder == EncoderType.NVIDIA_NVENC:
+            return ["-hwaccel", "cuda"]
+        return []
+
     def _build_filter_complex(self, 
                             crop_overlap: int = 32) -> str:
         """Build ffmpeg filter complex for tile processing."""
@@ -197,11 +262,8 @@ class VideoProcessor:
             "[0:v:1]crop=iw-{overlap}:ih-{overlap}:{overlap}:0[tr];"
             "[0:v:2]crop=iw-{overlap}:ih-{overlap}:0:{overlap}[bl];"
             "[0:v:3]crop=iw-{overlap}:ih-{overlap}:{overlap}:{overlap}[br];"
-            # Stack tiles horizontally
-            "[tl][tr]hstack=2[top];"
-            "[bl][br]hstack=2[bottom];"
-            # Stack rows vertically
-            "[top][bottom]vstack=2[full]"
+            # Place all four tiles in one pass (w0/h0 are the first tile's size)
+            "[tl][tr][bl][br]xstack=inputs=4:layout=0_0|w0_0|0_h0|w0_h0[full]"
         ).format(overlap=crop_overlap)
         
         # Add scaling to target resolution
@@ -216,33 +278,78 @@ class VideoProcessor:
 
     def _create_concat_file(self, segments: List[SegmentInfo]) -> Path:
         """Create temporary concat file for ffmpeg"""
-        # Use platform-agnostic temp file creation
-        temp_file = Path(tempfile.mktemp(suffix='.txt'))
-        
-        # Log segment information
+        # Log segment information. The .ts lists come straight from the
+        # validation directory scan, so they are not re-checked on disk here.
         self.logger.debug(f"Creating concat file with {len(segments)} segments")
-        for i, segment in enumerate(segments):
-            self.logger.debug(f"Segment {i}:")
-            self.logger.debug(f"  Directory: {segment.directory}")
-            self.logger.debug(f"  TS Files: {len(segment.ts_files)}")
-            for ts_file in segment.ts_files:
-                if not ts_file.exists():
-                    self.logger.error(f"TS file does not exist: {ts_file}")
-                else:
-                    self.logger.debug(f"  - {ts_file}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for i, segment in enumerate(segments):
+                self.logger.debug(f"Segment {i}: {segment.directory} ({len(segment.ts_files)} TS files)")
         
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            for segment in segments:
-                for ts_file in segment.ts_files:
-                    # Use forward slashes even on Windows
-                    path_str = str(ts_file.absolute()).replace('\\', '/')
-                    f.write(f"file '{path_str}'\n")
-                    
-        return temp_file
+        # Render the whole list up front and write it in one call
+        lines = []
+        for segment in segments:
+            for ts_file in segment.ordered_ts_files:
+                # Use forward slashes even on Windows; quotes are escaped concat-style
+                path_str = ts_file.absolute().as_posix().replace("'", "'\\''")
+                lines.append(f"file '{path_str}'\n")
+        payload = "".join(lines).encode('utf-8')
+        
+        # mkstemp creates the file atomically, unlike the racy mktemp
+        fd, temp_name = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        
+        return Path(temp_name)
+
+    def _run_ffmpeg(self,
+                   cmd: List[str],
+                   on_progress: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Run an ffmpeg command, streaming its stderr rather than buffering it.
+        
+        Only the last few stderr lines are kept, so memory use does not grow
+        with encode length. Text mode splits ffmpeg's carriage-return
+        progress updates into separate lines.
+        
+        Args:
+            cmd: Complete ffmpeg command line
+            on_progress: Called with the frame count from each progress line
+            
+        Raises:
+            subprocess.CalledProcessError: If ffmpeg exits with an error
+        """
+        tail = deque(maxlen=_STDERR_TAIL_LINES)
+        with subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            creationflags=_CREATIONFLAGS
+        ) as proc:
+            for line in proc.stderr:
+                if on_progress is not None and (match := _FRAME_PROGRESS_RE.search(line)):
+                    on_progress(int(match.group(1)))
+                tail.append(line)
+        
+        stderr_tail = "".join(tail).strip()
+        if stderr_tail:
+            self.logger.debug(f"FFmpeg stderr (last {len(tail)} lines):\n{stderr_tail}")
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr_tail)
 
     def process_clip(self,
-                    clip_result: ClipValidationResult) -> ProcessingResult:
-        """Process a validated clip."""
+                    clip_result: ClipValidationResult,
+                    on_progress: Optional[Callable[[int], None]] = None) -> ProcessingResult:
+        """
+        Process a validated clip.
+        
+        Args:
+            clip_result: Validated clip to encode
+            on_progress: Called with the number of frames encoded so far
+        """
         try:
             output_path = self.output_dir / f"{clip_result.clip.name}.mp4"
             concat_file = self._create_concat_file(clip_result.segments)
@@ -256,8 +363,9 @@ class VideoProcessor:
             self.logger.debug(f"Output will be written to {output_path}")
             
             # Log concat file contents for debugging
-            with open(concat_file, 'r') as f:
-                self.logger.debug(f"Concat file contents:\n{f.read()}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                with open(concat_file, 'r', encoding='utf-8') as f:
+                    self.logger.debug(f"Concat file contents:\n{f.read()}")
                 
             success = False
             error_messages = []
@@ -284,35 +392,31 @@ class VideoProcessor:
                 thread_count = None
                 self.logger.info(f"Using all available threads")
                 
+            # Encoder-independent arguments are built once and reused for each attempt
+            memory_opts = []
+            if self.options.low_memory or self.options.quality_mode in [ProcessingMode.LOW_MEMORY, ProcessingMode.MINIMAL]:
+                # Add options to reduce memory usage
+                memory_opts = [
+                    "-max_muxing_queue_size", "1024",  # Reduce muxing queue size
+                    "-tile-columns", "0",              # Disable tiling to save memory
+                    "-frame-parallel", "0"             # Disable parallel frame processing
+                ]
+                self.logger.info("Added memory-saving FFmpeg options")
+            
+            self.logger.debug(f"Building filter complex with output resolution: {self.options.output_resolution}")
+            input_args = ["-f", "concat", "-safe", "0", "-i", str(concat_file)]
+            filter_args = ["-filter_complex", self._build_filter_complex(), "-map", "[out]"]
+            
             for encoder in self._available_encoders:
                 try:
                     # Build base command
                     cmd = [
                         "ffmpeg", "-y",
-                        "-f", "concat",
-                        "-safe", "0",
-                        "-i", str(concat_file)
+                        *self._get_decoder_settings(encoder),
+                        *input_args,
+                        *filter_args
                     ]
                     
-                    # Add memory-saving options if enabled
-                    memory_opts = []
-                    if self.options.low_memory or self.options.quality_mode in [ProcessingMode.LOW_MEMORY, ProcessingMode.MINIMAL]:
-                        # Add options to reduce memory usage
-                        memory_opts = [
-                            "-max_muxing_queue_size", "1024",  # Reduce muxing queue size
-                            "-tile-columns", "0",              # Disable tiling to save memory
-                            "-frame-parallel", "0"             # Disable parallel frame processing
-                        ]
-                        self.logger.info("Added memory-saving FFmpeg options")
-                    
-                    # Add filter complex
-                    self.logger.debug(f"Building filter complex with output resolution: {self.options.output_resolution}")
-                    filter_complex = self._build_filter_complex()
-                    cmd.extend(["-filter_complex", filter_complex])
-                    
-                    # Map the output of the filter complex
-                    cmd.extend(["-map", "[out]"])
-                    
                     # Add encoder settings with thread control
                     use_threads = thread_count if (
                         encoder == EncoderType.SOFTWARE_X264 and 
@@ -329,26 +433,13 @@ class VideoProcessor:
                     # Log the complete ffmpeg command with all arguments
                     self.logger.debug(f"Executing ffmpeg command:\n{' '.join(cmd)}")
                     
-                    # Create subprocess with platform-specific settings
-                    creation_flags = 0
-                    if os.name == 'nt':  # Windows
-                        creation_flags = subprocess.CREATE_NO_WINDOW
-                    
-                    result = subprocess.run(
-                        cmd,
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                        encoding='utf-8',
-                        errors='replace',
-                        creationflags=creation_flags
-                    )
-                    
-                    # Log command output at debug level
-                    if result.stdout.strip():
-                        self.logger.debug(f"FFmpeg stdout:\n{result.stdout.strip()}")
-                    if result.stderr.strip():
-                        self.logger.debug(f"FFmpeg stderr:\n{result.stderr.strip()}")
+                    if encoder == EncoderType.NVIDIA_NVENC:
+                        self._run_ffmpeg(cmd, on_progress)
+                    else:
+                        # ffmpeg may list NVENC without a usable GPU; fallbacks must not
+                        # run several all-thread software encodes side by side
+                        with self._software_encode_lock:
+                            self._run_ffmpeg(cmd, on_progress)
                     
                     success = True
                     break
@@ -379,7 +470,7 @@ class VideoProcessor:
             # Add platform-specific optimizations for output file
             if output_path.exists():
                 # Attempt to minimize disk cache usage on Windows
-                if os.name == 'nt':
+                if _IS_WINDOWS:
                     try:
                         with open(str(output_path), 'rb+') as f:
                             # FILE_FLAG_NO_BUFFERING equivalent in Python
@@ -420,4 +511,50 @@ class VideoProcessor:
             if self.options.low_memory or self.options.quality_mode in [ProcessingMode.LOW_MEMORY, ProcessingMode.MINIMAL]:
                 import gc
                 gc.collect()
-                self.logger.debug("Forced garbage collection after processing")
\ No newline at end of file
+                self.logger.debug("Forced garbage collection after processing")
+
+    def _clip_workers(self) -> int:
+        """
+        Number of clips to encode at once.
+        
+        NVENC encodes run on dedicated hardware, so a couple of sessions can
+        overlap one clip's CPU-side decode/filtering with another's encode.
+        The cap comes from NVENC_MAX_SESSIONS (consumer cards allow 2).
+        Software encoders already use every core for a single clip, and the
+        memory-saving modes exist to bound peak usage, so in those cases
+        clips are processed one at a time.
+        """
+        if not self._available_encoders or self._available_encoders[0] != EncoderType.NVIDIA_NVENC:
+            return 1
+        if self.options.low_memory or self.options.quality_mode in [ProcessingMode.LOW_MEMORY, ProcessingMode.MINIMAL]:
+            return 1
+        try:
+            sessions = int(os.environ.get("NVENC_MAX_SESSIONS", _DEFAULT_NVENC_SESSIONS))
+        except ValueError:
+            self.logger.warning("Ignoring invalid NVENC_MAX_SESSIONS value")
+            sessions = _DEFAULT_NVENC_SESSIONS
+        return max(1, sessions)
+
+    def process_clips(self,
+                     clip_results: List[ClipValidationResult]) -> Iterator[ProcessingResult]:
+        """
+        Process several validated clips, concurrently where the encoder allows.
+        
+        Each clip runs in its own ffmpeg process, so worker threads are enough
+        to keep several encodes in flight.
+        
+        Args:
+            clip_results: Validated clips to process
+            
+        Yields:
+            ProcessingResult for each clip, in the order given
+        """
+        workers = min(self._clip_workers(), len(clip_results))
+        if workers <= 1:
+            for clip_result in clip_results:
+                yield self.process_clip(clip_result)
+            return
+        
+        self.logger.info(f"Processing {len(clip_results)} clips with {workers} concurrent encodes")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(self.process_clip, clip_results)
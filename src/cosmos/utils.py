@@ -1,29 +1,41 @@
 # File: src/cosmos/utils.py
 
+import functools
 import logging
 import json
 import subprocess
 import shutil
 import sys
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 __version__ = "0.2.1"  # Just an example version
 
+_FORMATTER = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+# (level, logfile) of the handlers currently installed by init_logging
+_active_logging_config: Optional[Tuple[int, Optional[Path]]] = None
+
 def init_logging(level: str = "INFO", logfile: Optional[Path] = None) -> logging.Logger:
     """Initialize logging configuration for the entire application."""
-    # Configure root logger
+    global _active_logging_config
+
+    lvl = getattr(logging, level.upper(), logging.INFO)
+    logger = logging.getLogger("cosmos")
     root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, level.upper(), logging.INFO))
-    root_logger.handlers.clear()
     
-    # Create formatters
-    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    # Repeat calls with the same settings keep the existing handlers
+    if root_logger.handlers and _active_logging_config == (lvl, logfile):
+        return logger
+    
+    # Configure root logger
+    root_logger.setLevel(lvl)
+    root_logger.handlers.clear()
     
     # Add console handler
     ch = logging.StreamHandler(sys.stdout)
-    ch.setLevel(getattr(logging, level.upper(), logging.INFO))
-    ch.setFormatter(formatter)
+    ch.setLevel(lvl)
+    ch.setFormatter(_FORMATTER)
     root_logger.addHandler(ch)
     
     # Add file handler if logfile specified
@@ -32,13 +44,14 @@ def init_logging(level: str = "INFO", logfile: Optional[Path] = None) -> logging
         logfile.parent.mkdir(parents=True, exist_ok=True)
         
         fh = logging.FileHandler(logfile, encoding='utf-8')
-        fh.setLevel(getattr(logging, level.upper(), logging.INFO))
-        fh.setFormatter(formatter)
+        fh.setLevel(lvl)
+        fh.setFormatter(_FORMATTER)
         root_logger.addHandler(fh)
     
-    # Create and return the main application logger
-    logger = logging.getLogger("cosmos")
-    logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    _active_logging_config = (lvl, logfile)
+    
+    # Return the main application logger
+    logger.setLevel(lvl)
     return logger
 
 def get_configs_dir() -> Path:
@@ -81,16 +94,57 @@ def save_config(config_path: Path, config: Dict[str, Any]) -> None:
     with open(config_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2)
 
-def check_ffmpeg() -> bool:
+@functools.lru_cache(maxsize=1)
+def probe_ffmpeg() -> Tuple[bool, Optional[str]]:
+    """
+    Check once per process whether ffmpeg can be run.
+
+    Returns:
+        (ok, error_kind) where error_kind is "not_found" if ffmpeg is not
+        on PATH, "failed" if it exists but `ffmpeg -version` fails, or None.
+    """
+    if shutil.which("ffmpeg") is None:
+        return False, "not_found"
     try:
         subprocess.run(["ffmpeg", "-version"], check=True, capture_output=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    except subprocess.CalledProcessError:
+        return False, "failed"
+    except FileNotFoundError:
+        return False, "not_found"
+    return True, None
+
+def check_ffmpeg() -> bool:
+    """Check whether ffmpeg is installed and runs (shares probe_ffmpeg's cached result)."""
+    return probe_ffmpeg()[0]
 
 def is_git_available() -> bool:
     return shutil.which("git") is not None
 
+def _read_local_head(repo_path: Path) -> Optional[str]:
+    """
+    Resolve the local HEAD commit by reading the .git directory directly.
+    Returns None if HEAD cannot be resolved from disk (e.g. worktrees).
+    """
+    git_dir = repo_path / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if not head.startswith("ref: "):
+            # Detached HEAD stores the commit hash directly
+            return head
+        ref = head[len("ref: "):]
+        ref_file = git_dir / ref
+        if ref_file.is_file():
+            return ref_file.read_text(encoding="utf-8").strip()
+        # Ref may have been packed by `git gc`
+        with open(git_dir / "packed-refs", 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
 def check_for_updates(repo_path: Path) -> bool:
     """
     Check if updates are available for a Git repository.
@@ -98,10 +152,15 @@ def check_for_updates(repo_path: Path) -> bool:
     If any error occurs, returns False.
     """
     try:
-        # 'git fetch' to update remote refs
-        subprocess.run(["git", "-C", str(repo_path), "fetch"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        remote_head = subprocess.check_output(["git", "-C", str(repo_path), "ls-remote", "origin", "HEAD"], text=True).split()[0]
-        local_head = subprocess.check_output(["git", "-C", str(repo_path), "rev-parse", "HEAD"], text=True).strip()
+        # Only the remote lookup needs git; no fetch is required to compare hashes
+        remote_head = subprocess.check_output(
+            ["git", "-C", str(repo_path), "ls-remote", "origin", "HEAD"],
+            text=True,
+            stderr=subprocess.PIPE
+        ).split()[0]
+        local_head = _read_local_head(repo_path)
+        if local_head is None:
+            local_head = subprocess.check_output(["git", "-C", str(repo_path), "rev-parse", "HEAD"], text=True).strip()
         return remote_head != local_head
     except Exception as e:
         print_error(f"Error checking for updates: {e}")
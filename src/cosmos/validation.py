@@ -1,13 +1,76 @@
-from dataclasses import dataclass
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import json
+import os
 import shutil
-import subprocess
+import time
 import logging
 
 from .manifest import ClipInfo, ClipStatus, Position, ManifestParser
+from .utils import probe_ffmpeg
+
+# Optional faster decoder for meta.json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# How long a free-space reading for the output directory stays valid
+_DISK_FREE_TTL_S = 5.0
+
+# Worker threads for segment loading, which is dominated by small filesystem reads
+_SEGMENT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+# Output size estimate as a multiple of the source .ts bytes. Re-encoding the
+# HEVC tiles to H.264 near source resolution (8k/original, CRF 18 in QUALITY
+# mode) can produce more bytes than the source, and validation does not know
+# the output settings, so the disk-space check keeps a generous margin.
+_OUTPUT_SIZE_MARGIN = 3
+
+def _decode_meta(meta_bytes: bytes):
+    """
+    Decode meta.json, with orjson when installed.
+
+    orjson rejects inputs the stdlib accepts (NaN/Infinity literals), so on
+    a decode error the stdlib gets the final say; results then do not depend
+    on whether orjson is installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(meta_bytes)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(meta_bytes)
+
+def _scan_segment_dir(segment_dir: Path) -> Tuple[bool, List[Path], int]:
+    """
+    List a segment directory once, reporting meta.json presence, .ts files and
+    their combined size in bytes.
+
+    The .ts files are returned in directory order; validation only needs the
+    count, so sorting is left to consumers that need playback order (see
+    SegmentInfo.ordered_ts_files). A missing directory raises
+    FileNotFoundError/NotADirectoryError from scandir itself, so no separate
+    existence check is needed. Sizes come from DirEntry.stat(), which costs
+    one lstat per .ts file on POSIX (cached on the entry, free on Windows).
+    """
+    has_meta = False
+    ts_files = []
+    ts_bytes = 0
+    with os.scandir(segment_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name == "meta.json":
+                has_meta = True
+            elif name.endswith(".ts") and entry.is_file(follow_symlinks=False):
+                ts_files.append(segment_dir / name)
+                ts_bytes += entry.stat(follow_symlinks=False).st_size
+    return has_meta, ts_files, ts_bytes
 
 class ValidationLevel(Enum):
     """Severity level for validation issues"""
@@ -15,7 +78,7 @@ class ValidationLevel(Enum):
     WARNING = "warning"       # Potential issue, can proceed with caution
     INFO = "info"             # Informational note
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ValidationIssue:
     """Details about a validation problem"""
     level: ValidationLevel
@@ -23,30 +86,57 @@ class ValidationIssue:
     context: Optional[str] = None
     help_text: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SegmentInfo:
     """Information about a video segment from meta.json"""
     directory: Path
     start_time: float
-    frame_timestamps: List[float]
-    ts_files: List[Path]
+    frame_timestamps: Sequence[float]  # array('d') when loaded from disk
+    ts_files: List[Path]               # Not necessarily in playback order
+    ts_bytes: int = 0                  # Combined size of ts_files on disk
+    # Derived from frame_timestamps once, at construction
+    _end_time: float = field(init=False, repr=False, compare=False)
+    _frame_count: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Frozen, so bypass the generated __setattr__
+        object.__setattr__(
+            self, "_end_time",
+            self.frame_timestamps[-1] if self.frame_timestamps else self.start_time
+        )
+        object.__setattr__(self, "_frame_count", len(self.frame_timestamps))
     
     @property
     def end_time(self) -> float:
         """Get end time of segment from last frame timestamp"""
-        return self.frame_timestamps[-1] if self.frame_timestamps else self.start_time
+        return self._end_time
     
     @property
     def frame_count(self) -> int:
         """Number of frames in segment"""
-        return len(self.frame_timestamps)
+        return self._frame_count
     
     @property
     def duration(self) -> float:
         """Approximate duration based on ts_files count (each ts represents 0.1s)"""
         return len(self.ts_files) * 0.1
+    
+    @property
+    def has_all_files(self) -> bool:
+        """Check every ts file is still on disk using one directory listing"""
+        try:
+            with os.scandir(self.directory) as it:
+                names = {entry.name for entry in it}
+        except OSError:
+            return False
+        return all(ts_file.name in names for ts_file in self.ts_files)
+    
+    @property
+    def ordered_ts_files(self) -> List[Path]:
+        """ts_files sorted by file name, i.e. in playback order"""
+        return sorted(self.ts_files, key=lambda p: p.name)
 
-@dataclass
+@dataclass(slots=True)
 class ClipValidationResult:
     """Validation results for a single clip"""
     clip: ClipInfo
@@ -63,7 +153,7 @@ class ClipValidationResult:
             for issue in self.issues
         )
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Complete validation results for input directory"""
     system_issues: List[ValidationIssue]
@@ -80,6 +170,15 @@ class ValidationResult:
             and self.available_space > self.total_size_estimate
         )
 
+@dataclass(slots=True)
+class _PendingClip:
+    """A clip whose segment loads have been submitted but not yet collected"""
+    clip: ClipInfo
+    start_sec: int
+    end_sec: int
+    missing_positions: List[Position] = field(default_factory=list)
+    pending: Dict[int, Tuple[str, Future]] = field(default_factory=dict)
+
 class InputValidator:
     """
     Validates input data and system requirements for COSM video processing.
@@ -99,25 +198,25 @@ class InputValidator:
         self.output_dir = output_dir
         self.manifest_parser = manifest_parser
         self.logger = logging.getLogger(__name__)
+        # Minute directory listings, shared by clips and validation passes
+        # until refresh() is called
+        self._dir_cache: Dict[str, Dict[int, str]] = {}
+        self._disk_free: Optional[int] = None
+        self._disk_free_ts = 0.0
         
     def validate_system(self) -> List[ValidationIssue]:
         """Check system requirements"""
         issues = []
         
         # Check ffmpeg installation
-        try:
-            subprocess.run(
-                ["ffmpeg", "-version"], 
-                capture_output=True, 
-                check=True
-            )
-        except subprocess.CalledProcessError:
+        ffmpeg_ok, ffmpeg_error = probe_ffmpeg()
+        if ffmpeg_error == "failed":
             issues.append(ValidationIssue(
                 level=ValidationLevel.ERROR,
                 message="FFmpeg not found",
                 help_text="Please install FFmpeg to process videos"
             ))
-        except FileNotFoundError:
+        elif not ffmpeg_ok:
             issues.append(ValidationIssue(
                 level=ValidationLevel.ERROR,
                 message="FFmpeg not found in system PATH",
@@ -127,6 +226,11 @@ class InputValidator:
         # Check output directory
         try:
             self.output_dir.mkdir(parents=True, exist_ok=True)
+            # access() can report a false "writable" (Windows ACLs, NFS
+            # root_squash) but never a false "unwritable", so it only serves to
+            # fail early; the real write probe always runs otherwise
+            if not os.access(self.output_dir, os.W_OK):
+                raise PermissionError(f"{self.output_dir} is not writable")
             test_file = self.output_dir / ".write_test"
             test_file.touch()
             test_file.unlink()
@@ -139,6 +243,62 @@ class InputValidator:
             
         return issues
     
+    def refresh(self) -> None:
+        """Drop cached directory listings and free-space readings"""
+        self._dir_cache.clear()
+        self._disk_free = None
+    
+    def _get_free_space(self) -> int:
+        """Free bytes on the output volume, re-read at most every few seconds"""
+        now = time.monotonic()
+        if self._disk_free is None or now - self._disk_free_ts > _DISK_FREE_TTL_S:
+            self._disk_free = shutil.disk_usage(self.output_dir).free
+            self._disk_free_ts = now
+        return self._disk_free
+    
+    @staticmethod
+    def _second_range(clip: ClipInfo) -> Tuple[int, int]:
+        """First and last second (inclusive) to scan for a clip"""
+        start_sec = int(clip.start_pos.second)
+        end_sec = int(clip.end_pos.second) if clip.end_pos else start_sec + 60
+        return start_sec, end_sec
+    
+    def _list_minute_dir(self, position: Position) -> Dict[int, str]:
+        """
+        List the second-level directories under a position's minute directory.
+        
+        A single scandir replaces one is_dir() stat per candidate second.
+        
+        Args:
+            position: Any position within the minute to list
+            
+        Returns:
+            Mapping of second number (from e.g. '25S') to the directory's path
+            string, in ascending second order; empty if the minute directory
+            does not exist. Listings are cached until
+            refresh() is called.
+        """
+        # Work on plain strings; Path objects are only built for segments we load
+        minute_dir = os.path.join(self.input_dir, position.minute_fragment())
+        if (cached := self._dir_cache.get(minute_dir)) is not None:
+            return cached
+        
+        try:
+            with os.scandir(minute_dir) as it:
+                entries = [
+                    (int(entry.name[:-1]), entry.path)
+                    for entry in it
+                    if entry.name.endswith("S") and entry.name[:-1].isdigit() and entry.is_dir()
+                ]
+        except (FileNotFoundError, NotADirectoryError):
+            entries = []
+        
+        # Sort once here so every clip in this minute can walk seconds in order
+        present = dict(sorted(entries))
+        
+        self._dir_cache[minute_dir] = present
+        return present
+    
     def load_segment(self, segment_dir: Path) -> Optional[SegmentInfo]:
         """
         Load a segment directory and its meta.json without FPS checks yet.
@@ -150,94 +310,160 @@ class InputValidator:
             SegmentInfo if valid, None if invalid
         """
         meta_path = segment_dir / "meta.json"
-        self.logger.debug(f"Loading segment at {segment_dir}")
+        self.logger.debug("Loading segment at %s", segment_dir)
+        
+        # One directory listing proves the segment exists, tells us whether
+        # meta.json is there, and gives us the .ts files
+        try:
+            has_meta, ts_files, ts_bytes = _scan_segment_dir(segment_dir)
+        except OSError:
+            self.logger.debug("Segment directory not readable: %s", segment_dir)
+            return None
+        if not has_meta:
+            self.logger.debug("No meta.json found in %s", segment_dir)
+            return None
         
-        if not meta_path.is_file():
-            self.logger.debug(f"No meta.json found in {segment_dir}")
+        try:
+            meta_bytes = meta_path.read_bytes()
+        except OSError:
+            self.logger.debug("No meta.json found in %s", segment_dir)
             return None
         
         try:
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
+            meta = _decode_meta(meta_bytes)
+            # Formatting the whole parsed document is costly; only do it when it will be emitted
+            if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(f"Loaded meta.json: {meta}")
                 
-            if "Time" not in meta or "x0" not in meta["Time"] or "xi-x0" not in meta["Time"]:
+            # Look up the Time object once; a non-dict anywhere means bad structure
+            time_obj = meta.get("Time") if isinstance(meta, dict) else None
+            try:
+                start_time = time_obj["x0"]
+                increments = time_obj["xi-x0"]
+            except (KeyError, TypeError):
                 self.logger.error(f"Invalid meta.json structure in {segment_dir}")
                 return None
-                
-            start_time = meta["Time"]["x0"]
-            increments = meta["Time"]["xi-x0"]
             
-            # Get all .ts files in directory
-            ts_files = sorted(segment_dir.glob("*.ts"))
-            self.logger.debug(f"Found {len(ts_files)} .ts files in {segment_dir}")
+            self.logger.debug("Found %d .ts files in %s", len(ts_files), segment_dir)
             
-            # Create timestamps for each frame
-            timestamps = [start_time + inc for inc in increments]
+            # Create timestamps for each frame as a packed float64 buffer
+            timestamps = array('d', (start_time + inc for inc in increments))
             
             self.logger.debug(
-                f"Segment loaded: start_time={start_time}, "
-                f"frame_count={len(timestamps)}, file_count={len(ts_files)}"
+                "Segment loaded: start_time=%s, frame_count=%d, file_count=%d",
+                start_time, len(timestamps), len(ts_files)
             )
             
             return SegmentInfo(
                 directory=segment_dir,
                 start_time=start_time,
                 frame_timestamps=timestamps,
-                ts_files=ts_files
+                ts_files=ts_files,
+                ts_bytes=ts_bytes
             )
             
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
             self.logger.warning(f"Warning: failed to parse meta.json in {segment_dir}: {e}")
             return None
     
-    def validate_clip(self, clip: ClipInfo) -> ClipValidationResult:
-        """Validate all segments for a clip, delaying FPS checks until after end_epoch is known."""
-        issues = []
-        segments = []
-        missing_positions = []
+    def validate_segment(self, segment_dir: Path) -> Optional[SegmentInfo]:
+        """
+        Validate a single segment directory.
         
-        self.logger.debug(f"Validating clip: {clip.name}")
+        Same as load_segment; meta.json is decoded with orjson when it is
+        installed and with the stdlib json module otherwise.
+        
+        Args:
+            segment_dir: Path to segment directory
+            
+        Returns:
+            SegmentInfo if valid, None if invalid
+        """
+        return self.load_segment(segment_dir)
+    
+    def validate_clip(self,
+                      clip: ClipInfo,
+                      pool: Optional[ThreadPoolExecutor] = None) -> ClipValidationResult:
+        """
+        Validate all segments for a clip, delaying FPS checks until after end_epoch is known.
+        
+        Args:
+            clip: Clip to validate
+            pool: Executor used to load segments concurrently; a private one
+                is created for this call if not given
+        """
+        with nullcontext(pool) if pool is not None else ThreadPoolExecutor(
+            max_workers=_SEGMENT_WORKERS
+        ) as executor:
+            return self._collect_clip(self._submit_clip(clip, executor))
+    
+    def _submit_clip(self, clip: ClipInfo, executor: ThreadPoolExecutor) -> _PendingClip:
+        """Record missing seconds for a clip and submit loads for the present ones"""
+        self.logger.debug("Validating clip: %s", clip.name)
         self.logger.debug(
-            f"Clip boundaries: "
-            f"start={clip.start_pos.to_string()}, "
-            f"frames={clip.start_idx}-{clip.end_idx}"
+            "Clip boundaries: start=%dH/%dM/%sS, frames=%d-%d",
+            clip.start_pos.hour, clip.start_pos.minute, clip.start_pos.second,
+            clip.start_idx, clip.end_idx
         )
 
-        start_sec = int(clip.start_pos.second)
-        end_sec = int(clip.end_pos.second) if clip.end_pos else start_sec + 60
-        total_positions = end_sec - start_sec + 1
-        
-        self.logger.debug(f"Scanning {total_positions} second positions")
+        start_sec, end_sec = self._second_range(clip)
+        self.logger.debug("Scanning %d second positions", end_sec - start_sec + 1)
+
+        present_dirs = self._list_minute_dir(clip.start_pos)
+        hour, minute = clip.start_pos.hour, clip.start_pos.minute
+        submitted = _PendingClip(clip=clip, start_sec=start_sec, end_sec=end_sec)
 
-        last_success_pos = None
-        for second in range(start_sec, end_sec + 1):
-            pos = Position(
-                hour=clip.start_pos.hour,
-                minute=clip.start_pos.minute,
-                second=second
+        # Nothing recorded in this minute: every second is missing
+        if not present_dirs:
+            submitted.missing_positions = [
+                Position(hour=hour, minute=minute, second=second)
+                for second in range(start_sec, end_sec + 1)
+            ]
+            return submitted
+
+        # Only walk the seconds that actually exist; the rest are missing by set difference
+        wanted = range(start_sec, end_sec + 1)
+        present = [second for second in present_dirs if start_sec <= second <= end_sec]
+        for second in present:
+            segment_dir = present_dirs[second]
+            submitted.pending[second] = (segment_dir, executor.submit(self.load_segment, Path(segment_dir)))
+        
+        if len(present) < len(wanted):
+            missing = sorted(set(wanted).difference(present))
+            self.logger.debug(
+                "Missing %d segment directories under %s/%s",
+                len(missing), self.input_dir, clip.start_pos.minute_fragment()
             )
-            
-            segment_dir = self.input_dir / pos.path_fragment()
-            self.logger.debug(f"Checking position {pos.to_string()} -> {segment_dir}")
-            
-            if not segment_dir.is_dir():
-                self.logger.debug(f"Missing segment directory: {segment_dir}")
-                missing_positions.append(pos)
-                continue
+            submitted.missing_positions = [
+                Position(hour=hour, minute=minute, second=second) for second in missing
+            ]
+        
+        return submitted
+    
+    def _collect_clip(self, submitted: _PendingClip) -> ClipValidationResult:
+        """Wait for a clip's segment loads and build its validation result"""
+        clip = submitted.clip
+        issues = []
+        segments = []
+        hour, minute = clip.start_pos.hour, clip.start_pos.minute
+        minute_fragment = clip.start_pos.minute_fragment()
+        total_positions = submitted.end_sec - submitted.start_sec + 1
 
-            if segment_info := self.load_segment(segment_dir):
+        # Consume results in second order so segments stay in temporal order
+        last_success_second = None
+        for second, (segment_dir, future) in submitted.pending.items():
+            if segment_info := future.result():
                 self.logger.debug(
-                    f"Segment loaded: {len(segment_info.ts_files)} files, "
-                    f"{len(segment_info.frame_timestamps)} frames"
+                    "Segment loaded: %d files, %d frames",
+                    len(segment_info.ts_files), len(segment_info.frame_timestamps)
                 )
                 segments.append(segment_info)
-                last_success_pos = pos
+                last_success_second = second
             else:
-                self.logger.debug(f"Invalid segment at {segment_dir}")
+                self.logger.debug("Invalid segment at %s", segment_dir)
                 issues.append(ValidationIssue(
                     level=ValidationLevel.WARNING,
-                    message=f"Invalid segment at {pos.path_fragment()}",
+                    message=f"Invalid segment at {minute_fragment}/{second}S",
                     context="Missing or corrupt meta.json"
                 ))
 
@@ -245,8 +471,8 @@ class InputValidator:
         if segments:
             # Update clip end based on last segment
             clip.end_epoch = segments[-1].end_time
-            if last_success_pos:
-                clip.end_pos = last_success_pos
+            if last_success_second is not None:
+                clip.end_pos = Position(hour=hour, minute=minute, second=last_success_second)
 
         # Report segment coverage
         found_segments = len(segments)
@@ -258,12 +484,13 @@ class InputValidator:
                 f"Clip {clip.name}: Found {found_segments}/{total_positions} "
                 f"segments ({coverage:.1f}% coverage)"
             )
-            for segment in segments:
-                self.logger.debug(
-                    f"Segment {segment.directory.name}: "
-                    f"{len(segment.ts_files)} files, "
-                    f"time range: {segment.start_time:.3f}-{segment.end_time:.3f}"
-                )
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for segment in segments:
+                    self.logger.debug(
+                        f"Segment {segment.directory.name}: "
+                        f"{len(segment.ts_files)} files, "
+                        f"time range: {segment.start_time:.3f}-{segment.end_time:.3f}"
+                    )
 
         # Now that we potentially have end_epoch, we can compute FPS and verify increments
         if segments and clip.end_epoch is not None:
@@ -288,17 +515,42 @@ class InputValidator:
                     message=f"Cannot determine FPS for clip {clip.name}: {e}"
                 ))
 
-        # Estimate output size (very rough)
-        estimated_size = len(segments) * 100 * 1024 * 1024
+        # Scale the source size by a safety margin; see _OUTPUT_SIZE_MARGIN
+        estimated_size = sum(segment.ts_bytes for segment in segments) * _OUTPUT_SIZE_MARGIN
 
         return ClipValidationResult(
             clip=clip,
             segments=segments,
-            missing_segments=missing_positions,
+            missing_segments=submitted.missing_positions,
             issues=issues,
             estimated_size=estimated_size
         )
     
+    def estimate_only(self) -> int:
+        """
+        Estimate the total output size without validating segment contents.
+        
+        Only the directories are listed; no meta.json is read, so this is
+        much cheaper than validate_all when just a size check is needed.
+        The .ts files of every present segment directory are counted, valid
+        or not, so this can exceed validate_all's estimate; it is meant for
+        the pre-flight space check (see preflight.check_output_space).
+        
+        Returns:
+            Estimated output size in bytes
+        """
+        total_size = 0
+        for clip in self.manifest_parser.get_clips():
+            start_sec, end_sec = self._second_range(clip)
+            present_dirs = self._list_minute_dir(clip.start_pos)
+            for second, segment_dir in present_dirs.items():
+                if start_sec <= second <= end_sec:
+                    try:
+                        total_size += _scan_segment_dir(Path(segment_dir))[2] * _OUTPUT_SIZE_MARGIN
+                    except OSError:
+                        continue
+        return total_size
+    
     def validate_all(self) -> ValidationResult:
         """
         Perform complete validation of system and input data
@@ -313,22 +565,32 @@ class InputValidator:
         clip_results = {}
         total_size = 0
         
-        for clip in self.manifest_parser.get_clips():
-            result = self.validate_clip(clip)
-            clip_results[clip.name] = result
-            total_size += result.estimated_size
+        # Submit segment loads for every clip to one shared pool before
+        # collecting any, so I/O is not serialised at clip boundaries
+        with ThreadPoolExecutor(max_workers=_SEGMENT_WORKERS) as pool:
+            submitted = [
+                self._submit_clip(clip, pool)
+                for clip in self.manifest_parser.get_clips()
+            ]
             
-            # Update clip status based on validation
-            if not result.segments:
-                clip.status = ClipStatus.MISSING
-            elif result.missing_segments:
-                clip.status = ClipStatus.PARTIAL
-            else:
-                clip.status = ClipStatus.COMPLETE
+            # Collect in manifest order; later clips keep loading meanwhile
+            for pending in submitted:
+                clip = pending.clip
+                result = self._collect_clip(pending)
+                clip_results[clip.name] = result
+                total_size += result.estimated_size
+                
+                # Update clip status based on validation
+                if not result.segments:
+                    clip.status = ClipStatus.MISSING
+                elif result.missing_segments:
+                    clip.status = ClipStatus.PARTIAL
+                else:
+                    clip.status = ClipStatus.COMPLETE
         
         # Check available space
         try:
-            available = shutil.disk_usage(self.output_dir).free
+            available = self._get_free_space()
         except Exception:
             available = 0
             system_issues.append(ValidationIssue(
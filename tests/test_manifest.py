@@ -43,6 +43,10 @@ class TestPosition:
     def test_to_string(self):
         pos = Position(hour=0, minute=0, second=3.8)
         assert pos.to_string() == "0H/0M/3.8S"
+        
+    def test_minute_fragment(self):
+        pos = Position(hour=1, minute=30, second=15.5)
+        assert pos.minute_fragment() == "1H/30M"
 
 class TestClipInfo:
     @pytest.fixture
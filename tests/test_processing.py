@@ -1,21 +1,43 @@
 # tests/test_processing.py
+import io
 import os
 from pathlib import Path
 import pytest
 import subprocess
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 from src.cosmos.processor import (
     ProcessingMode,
     ProcessingOptions,
     EncoderType,
     ProcessingResult,
-    VideoProcessor
+    VideoProcessor,
+    _probe_ffmpeg_encoders
 )
 from src.cosmos.validation import ClipValidationResult, SegmentInfo
 from src.cosmos.manifest import ClipInfo, Position
 
+def fake_popen(returncode=0, stderr="", before_exit=None):
+    """Build a subprocess.Popen side effect that replays canned ffmpeg stderr"""
+    def popen(cmd, **kwargs):
+        if before_exit is not None:
+            before_exit()
+        proc = MagicMock()
+        proc.__enter__.return_value = proc
+        # Universal newlines, as Popen's text mode splits on ffmpeg's \r updates
+        proc.stderr = io.StringIO(stderr, newline=None)
+        proc.returncode = returncode
+        return proc
+    return popen
+
 # Test fixtures
+@pytest.fixture(autouse=True)
+def clear_encoder_probe():
+    """Reset the cached encoder probe so tests can patch subprocess"""
+    _probe_ffmpeg_encoders.cache_clear()
+    yield
+    _probe_ffmpeg_encoders.cache_clear()
+
 @pytest.fixture
 def mock_clip_info():
     """Create a sample ClipInfo object"""
@@ -86,6 +108,7 @@ class TestVideoProcessor:
         with patch('subprocess.run') as mock_run:
             mock_run.return_value.stdout = ffmpeg_output
             mock_run.return_value.returncode = 0
+            _probe_ffmpeg_encoders.cache_clear()
             
             encoders = processor._detect_encoders()
             
@@ -97,19 +120,42 @@ class TestVideoProcessor:
         """Test fallback to software encoding when detection fails"""
         with patch('subprocess.run') as mock_run:
             mock_run.side_effect = subprocess.SubprocessError()
+            _probe_ffmpeg_encoders.cache_clear()
             
             encoders = processor._detect_encoders()
             
             assert len(encoders) == 1
             assert encoders[0] == EncoderType.SOFTWARE_X264
 
+    def test_encoder_detection_missing_ffmpeg(self, processor):
+        """Test a missing ffmpeg binary falls back to software encoding"""
+        with patch('subprocess.run', side_effect=FileNotFoundError()):
+            _probe_ffmpeg_encoders.cache_clear()
+            assert processor._detect_encoders() == [EncoderType.SOFTWARE_X264]
+
+    def test_encoder_detection_cached(self, processor):
+        """Test ffmpeg is only queried once across processors"""
+        with patch('subprocess.run') as mock_run:
+            mock_run.return_value.stdout = "libx264"
+            _probe_ffmpeg_encoders.cache_clear()
+            
+            processor._detect_encoders()
+            processor._detect_encoders()
+            
+            assert mock_run.call_count == 1
+
     def test_filter_complex_generation(self, processor):
         """Test FFmpeg filter complex string generation"""
         filter_complex = processor._build_filter_complex(crop_overlap=32)
         
         assert "[0:v:0]crop" in filter_complex
-        assert "hstack=2" in filter_complex
-        assert "vstack=2" in filter_complex
+        assert "xstack=inputs=4:layout=0_0|w0_0|0_h0|w0_h0" in filter_complex
+        assert "hstack" not in filter_complex
+
+    def test_decoder_settings(self, processor):
+        """Test hardware decoding is only requested alongside NVENC"""
+        assert processor._get_decoder_settings(EncoderType.NVIDIA_NVENC) == ["-hwaccel", "cuda"]
+        assert processor._get_decoder_settings(EncoderType.SOFTWARE_X264) == []
 
     def test_encoder_settings_quality_modes(self, processor):
         """Test encoder settings for different quality modes"""
@@ -127,10 +173,50 @@ class TestVideoProcessor:
         # Test PERFORMANCE mode
         options.quality_mode = ProcessingMode.PERFORMANCE
         settings = processor._get_encoder_settings(EncoderType.SOFTWARE_X264)
-        assert "medium" in settings
+        assert "veryfast" in settings
         assert "-crf" in settings
         assert "28" in settings  # Lower quality CRF
 
+    def test_nvenc_fixed_gop(self, processor):
+        """Test NVENC uses a short fixed keyframe interval"""
+        settings = processor._get_encoder_settings(EncoderType.NVIDIA_NVENC)
+        assert settings[settings.index("-g") + 1] == "60"
+        
+        # Software encoding keeps x264's own keyframe placement
+        assert "-g" not in processor._get_encoder_settings(EncoderType.SOFTWARE_X264)
+
+    def test_balanced_mode_uses_faster(self, processor):
+        """Test BALANCED mode trades the slow x264 presets for speed"""
+        processor.options = ProcessingOptions(
+            output_resolution=(3840, 2160),
+            quality_mode=ProcessingMode.BALANCED
+        )
+        settings = processor._get_encoder_settings(EncoderType.SOFTWARE_X264)
+        assert "faster" in settings
+        assert "23" in settings
+
+    @pytest.mark.parametrize("encoder, mode, preset, crf", [
+        (EncoderType.SOFTWARE_X264, ProcessingMode.QUALITY, "slower", "18"),
+        (EncoderType.SOFTWARE_X264, ProcessingMode.BALANCED, "faster", "23"),
+        (EncoderType.SOFTWARE_X264, ProcessingMode.PERFORMANCE, "veryfast", "28"),
+        (EncoderType.SOFTWARE_X264, ProcessingMode.LOW_MEMORY, "faster", "23"),
+        (EncoderType.SOFTWARE_X264, ProcessingMode.MINIMAL, "veryfast", "28"),
+        (EncoderType.NVIDIA_NVENC, ProcessingMode.QUALITY, "p7", "18"),
+        (EncoderType.NVIDIA_NVENC, ProcessingMode.BALANCED, "p2", "23"),
+        (EncoderType.NVIDIA_NVENC, ProcessingMode.PERFORMANCE, "p1", "28"),
+        (EncoderType.NVIDIA_NVENC, ProcessingMode.LOW_MEMORY, "p2", "23"),
+        (EncoderType.NVIDIA_NVENC, ProcessingMode.MINIMAL, "p1", "28"),
+    ])
+    def test_encoder_preset_table(self, processor, encoder, mode, preset, crf):
+        """Test preset and CRF for every encoder/quality mode combination"""
+        processor.options = ProcessingOptions(
+            output_resolution=(3840, 2160),
+            quality_mode=mode
+        )
+        settings = processor._get_encoder_settings(encoder)
+        assert settings[settings.index("-preset") + 1] == preset
+        assert settings[-1] == crf
+
     def test_thread_control(self, processor):
         """Test thread control for different processing modes"""
         import multiprocessing
@@ -161,7 +247,7 @@ class TestVideoProcessor:
     @pytest.mark.parametrize("platform", ["win32", "linux", "darwin"])
     def test_cross_platform_paths(self, processor, mock_validation_result, platform):
         """Test path handling across different platforms"""
-        with patch('os.name', platform):
+        with patch('src.cosmos.processor._IS_WINDOWS', platform == "win32"):
             concat_file = processor._create_concat_file(mock_validation_result.segments)
             
             # Check concat file contents
@@ -172,43 +258,109 @@ class TestVideoProcessor:
             assert '\\' not in content
             assert all(line.startswith("file '") for line in content.splitlines() if line)
 
-    @patch('subprocess.run')
-    def test_process_clip(self, mock_run, processor, mock_validation_result):
+    def test_concat_file_escapes_quotes(self, processor, tmp_path):
+        """Test single quotes in paths are escaped for the concat demuxer"""
+        segment_dir = tmp_path / "it's"
+        segment_dir.mkdir()
+        ts_file = segment_dir / "chunk_0.ts"
+        ts_file.touch()
+        segment = SegmentInfo(
+            directory=segment_dir,
+            start_time=0.0,
+            frame_timestamps=[0.0],
+            ts_files=[ts_file]
+        )
+        
+        concat_file = processor._create_concat_file([segment])
+        try:
+            content = concat_file.read_text(encoding='utf-8')
+        finally:
+            concat_file.unlink()
+            
+        assert content == f"file '{ts_file.parent.parent.as_posix()}/it'\\''s/chunk_0.ts'\n"
+
+    def test_process_clip(self, processor, mock_validation_result):
         """Test complete clip processing workflow"""
         # Mock successful ffmpeg execution
-        mock_run.return_value.returncode = 0
-        
-        result = processor.process_clip(mock_validation_result)
+        with patch('subprocess.Popen', side_effect=fake_popen()) as mock_popen:
+            result = processor.process_clip(mock_validation_result)
         
         assert result.success
         assert result.frames_processed > 0
         assert result.output_path.name == f"{mock_validation_result.clip.name}.mp4"
         
         # Verify ffmpeg was called with expected arguments
-        assert mock_run.called
-        cmd_args = mock_run.call_args[0][0]
+        assert mock_popen.called
+        cmd_args = mock_popen.call_args[0][0]
         assert "ffmpeg" in cmd_args
         assert "-filter_complex" in cmd_args
         
-    @patch('subprocess.run')
-    def test_process_clip_error_handling(self, mock_run, processor, mock_validation_result):
+    def test_process_clip_progress(self, processor, mock_validation_result):
+        """Test ffmpeg progress lines are streamed to the callback"""
+        stderr = (
+            "Input #0, mpegts, from 'concat.txt':\n"
+            "frame=   12 fps=0.0 q=28.0 size=       0kB time=00:00:00.40\r"
+            "frame=   48 fps= 47 q=28.0 size=     256kB time=00:00:01.60\r"
+            "frame=   60 fps= 45 q=-1.0 Lsize=     512kB time=00:00:02.00\n"
+        )
+        progress = []
+        with patch('subprocess.Popen', side_effect=fake_popen(stderr=stderr)):
+            result = processor.process_clip(mock_validation_result, on_progress=progress.append)
+            
+        assert result.success
+        assert progress == [12, 48, 60]
+        
+    def test_process_clips_parallel(self, processor, mock_validation_result, monkeypatch):
+        """Test clips are encoded concurrently when NVENC is available"""
+        import threading
+        monkeypatch.setenv("NVENC_MAX_SESSIONS", "2")
+        processor._available_encoders = [EncoderType.NVIDIA_NVENC, EncoderType.SOFTWARE_X264]
+        clip_results = [mock_validation_result, mock_validation_result]
+        
+        # Both encodes must be in flight at once to get past the barrier
+        barrier = threading.Barrier(len(clip_results), timeout=5)
+        with patch('subprocess.Popen', side_effect=fake_popen(before_exit=barrier.wait)) as mock_popen:
+            results = list(processor.process_clips(clip_results))
+            
+        assert mock_popen.call_count == len(clip_results)
+        assert all(result.success for result in results)
+        
+    @pytest.mark.parametrize("mode, low_memory", [
+        (ProcessingMode.BALANCED, True),
+        (ProcessingMode.LOW_MEMORY, False),
+        (ProcessingMode.MINIMAL, False),
+    ])
+    def test_process_clips_serial_in_low_memory_modes(self, processor, monkeypatch, mode, low_memory):
+        """Test memory-saving modes never encode clips concurrently"""
+        monkeypatch.setenv("NVENC_MAX_SESSIONS", "2")
+        processor._available_encoders = [EncoderType.NVIDIA_NVENC, EncoderType.SOFTWARE_X264]
+        processor.options = ProcessingOptions(
+            output_resolution=(3840, 2160),
+            quality_mode=mode,
+            low_memory=low_memory
+        )
+        
+        assert processor._clip_workers() == 1
+
+    def test_process_clip_error_handling(self, processor, mock_validation_result):
         """Test error handling during processing"""
         # Mock ffmpeg failure
-        mock_run.side_effect = subprocess.CalledProcessError(1, "ffmpeg")
-        
-        result = processor.process_clip(mock_validation_result)
+        with patch('subprocess.Popen', side_effect=fake_popen(returncode=1, stderr="Conversion failed!\n")):
+            result = processor.process_clip(mock_validation_result)
         
         assert not result.success
         assert result.error is not None
 
-    def test_windows_specific_flags(self, processor):
+    def test_windows_specific_flags(self, processor, mock_validation_result):
         """Test Windows-specific subprocess flags"""
-        with patch('os.name', 'nt'):
+        # CREATE_NO_WINDOW is only defined by subprocess on Windows
+        create_no_window = getattr(subprocess, "CREATE_NO_WINDOW", 0x08000000)
+        with patch('src.cosmos.processor._IS_WINDOWS', True), \
+             patch('src.cosmos.processor._CREATIONFLAGS', create_no_window):
             # Mock the processing to check command construction
-            with patch('subprocess.run') as mock_run:
-                mock_run.return_value.returncode = 0
+            with patch('subprocess.Popen', side_effect=fake_popen()) as mock_popen:
                 processor.process_clip(mock_validation_result)
                 
                 # Verify CREATE_NO_WINDOW flag was used
-                assert 'creationflags' in mock_run.call_args[1]
-                assert mock_run.call_args[1]['creationflags'] == subprocess.CREATE_NO_WINDOW
\ No newline at end of file
+                assert 'creationflags' in mock_popen.call_args[1]
+                assert mock_popen.call_args[1]['creationflags'] == create_no_window
@@ -6,6 +6,7 @@ import shutil
 import subprocess
 from datetime import datetime
 
+from src.cosmos import validation
 from src.cosmos.validation import (
     InputValidator,
     ValidationLevel,
@@ -15,8 +16,25 @@ from src.cosmos.validation import (
     ValidationResult
 )
 from src.cosmos.manifest import Position, ClipInfo, ManifestParser
+from src.cosmos.utils import probe_ffmpeg
 
 # Test fixtures
+@pytest.fixture(autouse=True)
+def clear_ffmpeg_probe():
+    """Reset the cached ffmpeg probe so tests can patch subprocess/PATH"""
+    probe_ffmpeg.cache_clear()
+    yield
+    probe_ffmpeg.cache_clear()
+
+@pytest.fixture(params=["json", "orjson"])
+def json_backend(request, monkeypatch):
+    """Decode meta.json with the stdlib json module, then with orjson if installed"""
+    if request.param == "orjson":
+        monkeypatch.setattr(validation, "orjson", pytest.importorskip("orjson"))
+    else:
+        monkeypatch.setattr(validation, "orjson", None)
+    return request.param
+
 @pytest.fixture
 def mock_input_dir(tmp_path):
     """Create a mock input directory structure with test data"""
@@ -45,7 +63,7 @@ def mock_input_dir(tmp_path):
             
         # Create dummy .ts files
         for i in range(4):
-            (segment_dir / f"chunk_{i}.ts").touch()
+            (segment_dir / f"chunk_{i}.ts").write_bytes(b"\0" * 1024)
     
     return input_dir
 
@@ -80,6 +98,8 @@ class TestSegmentInfo:
     @pytest.fixture
     def sample_segment(self, tmp_path):
         """Create a sample SegmentInfo object"""
+        for name in ("1.ts", "2.ts", "3.ts"):
+            (tmp_path / name).touch()
         return SegmentInfo(
             directory=tmp_path,
             start_time=1723559258.022,
@@ -101,8 +121,20 @@ class TestSegmentInfo:
     def test_frame_count(self, sample_segment):
         assert sample_segment.frame_count == 3
         
+    def test_ordered_ts_files(self, tmp_path):
+        segment = SegmentInfo(
+            directory=tmp_path,
+            start_time=1723559258.022,
+            frame_timestamps=[1723559258.022],
+            ts_files=[tmp_path / "2.ts", tmp_path / "3.ts", tmp_path / "1.ts"]
+        )
+        assert [p.name for p in segment.ordered_ts_files] == ["1.ts", "2.ts", "3.ts"]
+        
     def test_has_all_files(self, sample_segment):
         assert sample_segment.has_all_files is True
+        
+        sample_segment.ts_files[1].unlink()
+        assert sample_segment.has_all_files is False
 
 class TestInputValidator:
     def test_validate_system_ffmpeg_missing(self, validator, monkeypatch):
@@ -118,6 +150,35 @@ class TestInputValidator:
             for issue in issues
         )
     
+    def test_validate_system_ffmpeg_probe_cached(self, validator, monkeypatch):
+        """Test ffmpeg is only probed once across validation passes"""
+        calls = []
+        def mock_run(*args, **kwargs):
+            calls.append(args)
+            
+        monkeypatch.setattr(shutil, "which", lambda name: "/usr/bin/ffmpeg")
+        monkeypatch.setattr(subprocess, "run", mock_run)
+        validator.validate_system()
+        issues = validator.validate_system()
+        
+        assert len(calls) == 1
+        assert not any("FFmpeg" in issue.message for issue in issues)
+    
+    @pytest.mark.parametrize("access_ok", [False, True])
+    def test_validate_system_unwritable_output(self, validator, monkeypatch, access_ok):
+        """Test an unwritable output dir is reported even when access() says writable"""
+        def mock_touch(*args, **kwargs):
+            raise PermissionError("read-only")
+            
+        monkeypatch.setattr("os.access", lambda path, mode: access_ok)
+        monkeypatch.setattr(Path, "touch", mock_touch)
+        issues = validator.validate_system()
+        
+        assert any(
+            issue.level == ValidationLevel.ERROR and "output directory" in issue.message
+            for issue in issues
+        )
+    
     def test_validate_segment_valid(self, validator, mock_input_dir):
         """Test validation of a valid segment directory"""
         segment_dir = mock_input_dir / "0H" / "0M" / "25S"
@@ -127,6 +188,44 @@ class TestInputValidator:
         assert segment_info.frame_count == 4
         assert len(segment_info.ts_files) == 4
         
+    def test_load_segment_timestamps(self, validator, mock_input_dir):
+        """Test frame timestamps are offset from the segment start time"""
+        segment_info = validator.load_segment(mock_input_dir / "0H" / "0M" / "25S")
+        
+        assert segment_info.frame_count == 4
+        assert segment_info.start_time == pytest.approx(1723559283.0)
+        assert segment_info.end_time == pytest.approx(1723559283.05)
+        
+    def test_load_segment_json_backends(self, validator, mock_input_dir, json_backend):
+        """Test both meta.json decoders accept valid and reject corrupt files"""
+        segment_dir = mock_input_dir / "0H" / "0M" / "25S"
+        assert validator.load_segment(segment_dir).frame_count == 4
+        
+        (segment_dir / "meta.json").write_text("invalid json")
+        assert validator.load_segment(segment_dir) is None
+        
+    def test_load_segment_nan_literal(self, validator, mock_input_dir, json_backend):
+        """Test NaN literals are accepted whichever decoder is installed"""
+        segment_dir = mock_input_dir / "0H" / "0M" / "25S"
+        meta = {"Time": {"x0": 1723559258.0, "xi-x0": [0.0, float("nan")]}}
+        (segment_dir / "meta.json").write_text(json.dumps(meta))
+        
+        assert validator.load_segment(segment_dir).frame_count == 2
+        
+    @pytest.mark.parametrize("meta", [
+        [1, 2, 3],
+        {"Other": {}},
+        {"Time": [0.0, 0.017]},
+        {"Time": {"x0": 1723559258.0}},
+    ])
+    def test_load_segment_invalid_structure(self, validator, mock_input_dir, meta):
+        """Test meta.json without a Time object holding x0 and xi-x0 is rejected"""
+        segment_dir = mock_input_dir / "0H" / "0M" / "25S"
+        with open(segment_dir / "meta.json", "w") as f:
+            json.dump(meta, f)
+            
+        assert validator.load_segment(segment_dir) is None
+        
     def test_validate_segment_invalid_meta(self, mock_input_dir):
         """Test validation with invalid meta.json"""
         segment_dir = mock_input_dir / "0H" / "0M" / "25S"
@@ -164,6 +263,41 @@ class TestInputValidator:
         assert not result.is_valid
         assert len(result.missing_segments) > 0
         
+    def test_validate_clip_missing_minute_dir(self, validator, mock_input_dir):
+        """Test a clip whose minute directory is absent reports every second missing"""
+        shutil.rmtree(mock_input_dir / "0H" / "0M")
+        
+        clip = validator.manifest_parser.get_clips()[0]
+        result = validator.validate_clip(clip)
+        
+        assert not result.segments
+        assert not result.is_valid
+        assert len(result.missing_segments) == 61
+        assert result.missing_segments[0].second == 25
+        
+    def test_refresh_invalidates_directory_cache(self, validator, mock_input_dir):
+        """Test directory listings are reused until refresh() is called"""
+        clip = validator.manifest_parser.get_clips()[0]
+        first = validator.validate_clip(clip)
+        assert not any(pos.second == 26 for pos in first.missing_segments)
+        
+        shutil.rmtree(mock_input_dir / "0H" / "0M" / "26S")
+        cached = validator.validate_all().clip_results[clip.name]
+        assert not any(pos.second == 26 for pos in cached.missing_segments)
+        
+        validator.refresh()
+        fresh = validator.validate_all().clip_results[clip.name]
+        assert any(pos.second == 26 for pos in fresh.missing_segments)
+        
+    def test_estimate_only(self, validator, monkeypatch):
+        """Test size estimation sums .ts sizes without reading meta.json"""
+        def fail_load(*args, **kwargs):
+            raise AssertionError("meta.json should not be read")
+            
+        monkeypatch.setattr(validator, "load_segment", fail_load)
+        
+        assert validator.estimate_only() == 3 * 4 * 1024 * validation._OUTPUT_SIZE_MARGIN
+        
     def test_validate_all(self, validator):
         """Test complete validation process"""
         result = validator.validate_all()
@@ -183,6 +317,20 @@ class TestInputValidator:
         result = validator.validate_all()
         assert not result.can_proceed
 
+    def test_disk_usage_cached_between_runs(self, validator, monkeypatch):
+        """Test repeated validation passes reuse a recent free-space reading"""
+        calls = []
+        def mock_disk_usage(*args):
+            calls.append(args)
+            return type('Usage', (), {'free': 10 * 1024**4})()
+            
+        monkeypatch.setattr(shutil, "disk_usage", mock_disk_usage)
+        
+        validator.validate_all()
+        result = validator.validate_all()
+        assert len(calls) == 1
+        assert result.available_space == 10 * 1024**4
+
 def test_validation_issue_creation():
     """Test ValidationIssue creation and attributes"""
     issue = ValidationIssue(